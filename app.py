@@ -1,71 +1,104 @@
 import streamlit as st
 import pandas as pd
-import json
 import plotly.express as px
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
 
+import panda_stats
+
 # -----------------------------
 # Page Configuration & Custom CSS
 # -----------------------------
 st.set_page_config(page_title="Panda Park Dashboard", layout="wide")
 
-custom_css = """
-<style>
-/* General page styling */
-.reportview-container {
-    padding: 2rem 1rem;
-}
-[data-testid="stHeader"] {
-    background-color: #004d80;
-    color: white;
-    padding: 1rem;
-    font-size: 2rem;
-    font-weight: bold;
-}
-h2, h3 {
-    color: #004d80;
-}
-.stMetric {
-    font-size: 1.2rem;
-}
-[data-testid="stMarkdownContainer"] p {
-    font-size: 1.1rem;
-}
-</style>
-"""
-st.markdown(custom_css, unsafe_allow_html=True)
+
+# The stylesheet is read from disk once per process. It still has to be
+# emitted on every rerun: Streamlit removes elements a rerun does not render.
+# Theme colors live in .streamlit/config.toml.
+@st.cache_resource
+def load_css(path="static/style.css"):
+    with open(path, "r") as f:
+        return f"<style>\n{f.read()}</style>"
+
+
+st.markdown(load_css(), unsafe_allow_html=True)
 
 
 # -----------------------------
-# Load Data from JSON File
+# Load Data & Statistics (shared with main.py via panda_stats)
 # -----------------------------
-@st.cache_data
-def load_data():
-    with open("panda-park-data.json", "r") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data)
-    df["entry_dt"] = pd.to_datetime(df["entry_time"])
-    return df
+# cache_resource hands every rerun the same DataFrame object instead of a
+# fresh unpickled copy; only the edit form writes to it.
+load_data = st.cache_resource(panda_stats.load_data)
+
+# The dataset is keyed by identity: load_data always returns the same object,
+# so Streamlit does not need to hash the whole frame on every rerun. The
+# results are derived data, so cache_resource returns them as-is instead of
+# pickling the stats and masks on every lookup; treat them as read-only.
+compute_stats = st.cache_resource(hash_funcs={pd.DataFrame: id})(
+    panda_stats.compute_stats
+)
+build_mask = st.cache_resource(hash_funcs={pd.DataFrame: id})(panda_stats.build_mask)
+
+
+# The figures only depend on the per-day aggregates, so they are built once
+# per dataset and the same Figure objects are handed to st.plotly_chart on
+# every rerun instead of being rebuilt by plotly express. Each saved edit
+# yields new aggregates, so only the latest figures are kept.
+@st.cache_resource(max_entries=1)
+def build_line_figs(daily):
+    # Each line is downsampled on its own y values, bounding the points sent
+    # to the browser however many days the dataset covers.
+    line_fig = px.line(
+        panda_stats.downsample(daily, "count"),
+        x="transaction_date",
+        y="count",
+        title="Transactions Over Time",
+        markers=True,
+        render_mode="webgl",
+    )
+    line_fig.update_layout(template="simple_white", title_font_color="#004d80")
+    line_fig2 = px.line(
+        panda_stats.downsample(daily, "avg_duration"),
+        x="transaction_date",
+        y="avg_duration",
+        title="Average Parking Duration Over Time (min)",
+        markers=True,
+        render_mode="webgl",
+    )
+    line_fig2.update_layout(template="simple_white", title_font_color="#004d80")
+    return line_fig, line_fig2
+
+
+# Keyed on the (payment method, count) pairs; plotly gets the names and
+# values directly, without an intermediate DataFrame. Only the latest pie is
+# kept, as a saved edit can change the counts.
+@st.cache_resource(max_entries=1)
+def build_pie_fig(payment_items):
+    pie_fig = px.pie(
+        names=[pm for pm, _ in payment_items],
+        values=[count for _, count in payment_items],
+        title="Transactions by Payment Method",
+        color_discrete_sequence=px.colors.qualitative.Set2,
+    )
+    pie_fig.update_layout(template="simple_white", title_font_color="#004d80")
+    return pie_fig
 
 
 df = load_data()
+stats = compute_stats(df)
 
 # -----------------------------
 # Compute Top Panel Statistics
 # -----------------------------
 total_transactions = len(df)
-date_group = df.groupby("transaction_date").size().reset_index(name="count")
-date_group = date_group.sort_values("transaction_date")
-selected_day = date_group.iloc[-1]["transaction_date"]
-today_count = date_group.iloc[-1]["count"]
-delta_day = today_count - (date_group.iloc[-2]["count"] if len(date_group) >= 2 else 0)
-payment_counts = df["payment_method"].value_counts().to_dict()
-df["entry_hour"] = df["entry_dt"].dt.hour
+daily = stats["daily"]
+selected_day = daily.iloc[-1]["transaction_date"]
+today_count = daily.iloc[-1]["count"]
+delta_day = today_count - (daily.iloc[-2]["count"] if len(daily) >= 2 else 0)
+payment_counts = stats["payment_counts"]
 busy_hours = {
-    "10-13": len(df[(df["entry_hour"] >= 10) & (df["entry_hour"] < 13)]),
-    "13-16": len(df[(df["entry_hour"] >= 13) & (df["entry_hour"] < 16)]),
-    "16-19": len(df[(df["entry_hour"] >= 16) & (df["entry_hour"] < 19)]),
-    "19-22": len(df[(df["entry_hour"] >= 19) & (df["entry_hour"] < 22)]),
+    f"{start}-{end}": count
+    for (start, end), count in panda_stats.busy_hours(stats["hour_hist"]).items()
 }
 
 # -----------------------------
@@ -96,38 +129,8 @@ st.markdown("##")
 
 # Middle Panel: Charts
 st.header("Visualizations")
-line_fig = px.line(
-    date_group,
-    x="transaction_date",
-    y="count",
-    title="Transactions Over Time",
-    markers=True,
-)
-line_fig.update_layout(template="simple_white", title_font_color="#004d80")
-avg_duration = (
-    df.groupby("transaction_date")["duration_minutes"]
-    .mean()
-    .reset_index(name="avg_duration")
-)
-line_fig2 = px.line(
-    avg_duration,
-    x="transaction_date",
-    y="avg_duration",
-    title="Average Parking Duration Over Time (min)",
-    markers=True,
-)
-line_fig2.update_layout(template="simple_white", title_font_color="#004d80")
-pie_data = pd.DataFrame(
-    list(payment_counts.items()), columns=["payment_method", "count"]
-)
-pie_fig = px.pie(
-    pie_data,
-    names="payment_method",
-    values="count",
-    title="Transactions by Payment Method",
-    color_discrete_sequence=px.colors.qualitative.Set2,
-)
-pie_fig.update_layout(template="simple_white", title_font_color="#004d80")
+line_fig, line_fig2 = build_line_figs(daily)
+pie_fig = build_pie_fig(tuple(payment_counts.items()))
 
 col_chart1, col_chart2, col_chart3 = st.columns(3)
 with col_chart1:
@@ -140,32 +143,67 @@ st.markdown("##")
 
 # Bottom Panel: Data Table with Filter & Edit Form
 st.header("Detailed Transaction Data")
+# Set by the edit form just before its rerun; popped so the message shows once.
+if st.session_state.pop("record_saved", False):
+    st.success("Record updated successfully!")
+PAGE_SIZE = 200
+GRID_COLUMNS = [
+    column
+    for column in panda_stats.DISPLAY_COLUMNS
+    if column != "capture_license_plate_url"
+]
 payment_options = ["All", "EMONEY", "FLASH", "QRIS", "GOPAY", "DANA", "OVO"]
-selected_pm = st.selectbox("Filter by Payment Method", options=payment_options, index=0)
-if selected_pm != "All":
-    filtered_df = df[df["payment_method"] == selected_pm].copy()
+date_options = ["All", *daily["transaction_date"]]
+col_filter1, col_filter2 = st.columns(2)
+with col_filter1:
+    selected_pm = st.selectbox(
+        "Filter by Payment Method", options=payment_options, index=0
+    )
+with col_filter2:
+    selected_date = st.selectbox(
+        "Filter by Transaction Date", options=date_options, index=0
+    )
+filters = {"payment_method": selected_pm, "transaction_date": selected_date}
+masks = [
+    build_mask(df, column, value) for column, value in filters.items() if value != "All"
+]
+# No copy: with no active filter df itself is used, otherwise the matching
+# rows are gathered; the edit form writes to df directly.
+if masks:
+    filtered_df = df.iloc[panda_stats.select_rows(masks)]
 else:
-    filtered_df = df.copy()
+    filtered_df = df
 
-# Reset index and include it as a column for editing purposes.
-display_df = (
-    filtered_df.drop(columns=["entry_dt", "entry_hour"])
-    .reset_index()
-    .rename(columns={"index": "idx"})
+# Only the current page is sent to the browser, so the grid payload stays
+# bounded however many rows match the filter.
+page_count = max(1, -(-len(filtered_df) // PAGE_SIZE))
+page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+page_start = (page - 1) * PAGE_SIZE
+page_df = filtered_df.iloc[page_start : page_start + PAGE_SIZE]
+st.caption(
+    f"Showing rows {min(page_start + 1, len(filtered_df))}-"
+    f"{page_start + len(page_df)} of {len(filtered_df)}"
 )
 
+# Reset index and include it as a column for editing purposes. The image URL
+# is not shown in the grid; the edit form looks it up from df by idx.
+display_df = page_df[GRID_COLUMNS].reset_index().rename(columns={"index": "idx"})
+
 # Configure AgGrid options with single row selection.
 gb = GridOptionsBuilder.from_dataframe(display_df)
 gb.configure_selection(selection_mode="single", use_checkbox=False)
 gridOptions = gb.build()
 
+# Only selected_rows is read back, so the grid returns data as sent (no
+# filtered/sorted copy of the table) and only reruns on selection changes.
 grid_response = AgGrid(
     display_df,
     gridOptions=gridOptions,
     update_mode=GridUpdateMode.SELECTION_CHANGED,
-    data_return_mode=DataReturnMode.FILTERED_AND_SORTED,
+    data_return_mode=DataReturnMode.AS_INPUT,
     fit_columns_on_grid_load=True,
     enable_enterprise_modules=False,
+    key="ag-grid-main",
 )
 
 selected_rows = grid_response["selected_rows"]
@@ -184,7 +222,7 @@ if record is not None:
     with st.form("edit_form", clear_on_submit=False):
         col_left, col_right = st.columns(2)
         with col_left:
-            image_url = record.get("capture_license_plate_url", "")
+            image_url = df.at[record["idx"], "capture_license_plate_url"]
             if image_url:
                 st.image(image_url, caption="License Plate Capture", width=300)
             else:
@@ -206,20 +244,39 @@ if record is not None:
             )
             capture_license_plate_url = st.text_input(
                 "Capture License Plate URL",
-                value=str(record.get("capture_license_plate_url", "")),
+                value=str(image_url),
             )
         submitted = st.form_submit_button("Save Changes")
         if submitted:
-            row_idx = record["idx"]
-            filtered_df.loc[row_idx, "transaction_date"] = transaction_date
-            filtered_df.loc[row_idx, "payment_method"] = payment_method
-            filtered_df.loc[row_idx, "entry_time"] = entry_time
-            filtered_df.loc[row_idx, "duration_minutes"] = duration_minutes
-            filtered_df.loc[row_idx, "capture_license_plate_url"] = (
-                capture_license_plate_url
+            # Write straight into the shared frame (idx is its original
+            # index), log the change for the next load, then drop the
+            # statistics cached from the old values and rerun. Only fields that differ
+            # from the stored record are written.
+            changes = panda_stats.changed_fields(
+                df,
+                record["idx"],
+                {
+                    "transaction_date": transaction_date,
+                    "payment_method": payment_method,
+                    "entry_time": entry_time,
+                    "duration_minutes": int(duration_minutes),
+                    "capture_license_plate_url": capture_license_plate_url,
+                },
             )
-            st.success("Record updated successfully!")
-            # Optional: Update the main DataFrame or write back to JSON.
-            # df.update(filtered_df)
-            # with open("panda-park-data.json", "w") as f:
-            #     json.dump(df.to_dict(orient="records"), f, default=str)
+            if not changes:
+                st.info("No changes to save.")
+            else:
+                try:
+                    panda_stats.apply_edit(df, record["idx"], changes)
+                except ValueError as exc:
+                    st.error(f"Record not updated: {exc}")
+                else:
+                    panda_stats.append_edit(
+                        df.at[record["idx"], "transaction_id"], changes
+                    )
+                    compute_stats.clear()
+                    build_mask.clear()
+                    # The KPIs, charts and grid above were drawn from the old
+                    # values; rerun so the whole page reflects the edit.
+                    st.session_state["record_saved"] = True
+                    st.rerun()
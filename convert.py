@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+import panda_stats
+from panda_stats import DATA_PATH, DISPLAY_COLUMNS, EDITS_PATH, ENTRY_TIME_FORMAT
+
+# -----------------------------
+# One-time conversion: JSON -> Parquet
+# -----------------------------
+# The dashboards read the columnar Parquet file instead of parsing the JSON
+# on every cold start. Re-run this script whenever the source data changes.
+SOURCE = "panda-park-data.json"
+TARGET = DATA_PATH
+CHUNK_SIZE = 100_000
+
+
+def read_json_lines(source, chunksize=CHUNK_SIZE):
+    # JSON-lines (one record per line) is read in bounded chunks, so peak
+    # memory stays close to the final DataFrame instead of the full list of
+    # Python dicts that json.load builds.
+    parts = []
+    for chunk in pd.read_json(
+        source, lines=True, chunksize=chunksize, dtype=False, convert_dates=False
+    ):
+        chunk["entry_dt"] = pd.to_datetime(
+            chunk["entry_time"], format=ENTRY_TIME_FORMAT, cache=True
+        )
+        parts.append(chunk)
+    if not parts:
+        raise ValueError(f"{source} contains no records; nothing to convert")
+    return pd.concat(parts, ignore_index=True)
+
+
+def read_source(source=SOURCE):
+    if source.endswith(".jsonl"):
+        return read_json_lines(source)
+    df = pd.read_json(source, dtype=False, convert_dates=False)
+    # Store entry_time already parsed so the dashboards do no datetime work.
+    # The explicit format skips per-row format inference; cache=True parses
+    # each distinct timestamp once.
+    df["entry_dt"] = pd.to_datetime(
+        df["entry_time"], format=ENTRY_TIME_FORMAT, cache=True
+    )
+    return df
+
+
+def convert(source=SOURCE, target=TARGET):
+    df = read_source(source)
+    df.to_parquet(target, index=False)
+    return df
+
+
+def write_source(df, source=SOURCE):
+    # Same layout as the source it replaces (a JSON array, or one record per
+    # line for .jsonl), written through a temporary file so a crash never
+    # leaves a half-written source.
+    records = df[DISPLAY_COLUMNS].to_dict(orient="records")
+    tmp = f"{source}.tmp"
+    with open(tmp, "w") as f:
+        if source.endswith(".jsonl"):
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        else:
+            json.dump(records, f, indent=2)
+            f.write("\n")
+    os.replace(tmp, source)
+
+
+# -----------------------------
+# Periodic compaction: edits log -> JSON source (+ Parquet cache)
+# -----------------------------
+def compact(source=SOURCE, target=TARGET, edits_path=EDITS_PATH):
+    # The JSON source is the source of truth and the Parquet file only a cache
+    # rebuilt from it, so the edits are folded into the source; a later
+    # convert() then keeps them.
+    pending = panda_stats.pending_edits_path(edits_path)
+    # Move the live log aside before reading it: lines appended while this
+    # runs go to a fresh log and are kept for the next compaction. A pending
+    # log left by an interrupted run is folded first instead.
+    if not os.path.exists(pending) and os.path.exists(edits_path):
+        os.replace(edits_path, pending)
+    df = read_source(source)
+    for column in panda_stats.CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    panda_stats.replay_edits(df, pending)
+    write_source(df, source)
+    # Rebuild the cache from the merged source, then drop the folded lines.
+    # Replaying them again after a crash in between is harmless: the source
+    # already holds the same values.
+    df = convert(source, target)
+    if os.path.exists(pending):
+        os.remove(pending)
+    return df
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--compact"]:
+        source = sys.argv[2] if len(sys.argv) > 2 else SOURCE
+        df = compact(source)
+        print(f"Compacted {EDITS_PATH} into {source} and {TARGET} ({len(df)} rows)")
+    else:
+        source = sys.argv[1] if len(sys.argv) > 1 else SOURCE
+        df = convert(source)
+        print(f"Wrote {len(df)} rows to {TARGET}")
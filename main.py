@@ -1,71 +1,114 @@
+import functools
+
 import gradio as gr
-import pandas as pd
-import json
 import plotly.express as px
 
+import panda_stats
+
 # -----------------------------
-# Load Data from JSON File
+# Load Data from Parquet File
 # -----------------------------
-with open("panda-park-data.json", "r") as f:
-    data = json.load(f)
-df = pd.DataFrame(data)
+# Data, statistics and figures are built by cached functions: each is
+# computed once per process on first use, and the components receive the
+# functions, so every page load reuses the cached results.
+PAGE_SIZE = 200
+
+
+@functools.lru_cache(maxsize=1)
+def _data():
+    df = panda_stats.load_data()
+    return df, panda_stats.compute_stats(df), panda_stats.build_pm_index(df)
 
-# Convert entry_time to datetime for additional processing.
-df["entry_dt"] = pd.to_datetime(df["entry_time"])
 
 # -----------------------------
 # Compute Top Panel Statistics
 # -----------------------------
-# Total transactions
-total_transactions = len(df)
-
-# Count transactions for a specific day.
-# For demonstration, we use the latest transaction_date in the dataset.
-selected_day = df["transaction_date"].max()
-transactions_for_day = len(df[df["transaction_date"] == selected_day])
-
-# Total transactions by payment method
-payment_counts = df["payment_method"].value_counts()
-payment_stats_str = "\n".join([f"- {pm}: {cnt}" for pm, cnt in payment_counts.items()])
-
-# Transactions by busy hours.
-# Define operational hours as 10:00 to 22:00 (i.e. 10 AM to 10 PM) divided into 4 segments (3 hours each).
-df["entry_hour"] = df["entry_dt"].dt.hour
-seg1 = len(df[(df["entry_hour"] >= 10) & (df["entry_hour"] < 13)])
-seg2 = len(df[(df["entry_hour"] >= 13) & (df["entry_hour"] < 16)])
-seg3 = len(df[(df["entry_hour"] >= 16) & (df["entry_hour"] < 19)])
-seg4 = len(df[(df["entry_hour"] >= 19) & (df["entry_hour"] < 22)])
-busy_hours_str = (
-    f"- 10:00-13:00: {seg1}\n"
-    f"- 13:00-16:00: {seg2}\n"
-    f"- 16:00-19:00: {seg3}\n"
-    f"- 19:00-22:00: {seg4}"
-)
+@functools.lru_cache(maxsize=1)
+def _stats():
+    df, stats, _ = _data()
+
+    # Total transactions
+    total_transactions = len(df)
+
+    # Count transactions for a specific day.
+    # For demonstration, we use the latest transaction_date in the dataset.
+    daily = stats["daily"]
+    selected_day = daily["transaction_date"].iloc[-1]
+    transactions_for_day = int(daily["count"].iloc[-1])
+
+    # Total transactions by payment method, most frequent first.
+    payment_stats_str = "\n".join(
+        [f"- {pm}: {cnt}" for pm, cnt in stats["payment_counts"].items()]
+    )
+
+    # Transactions by busy hours.
+    # Define operational hours as 10:00 to 22:00 (i.e. 10 AM to 10 PM) divided into 4 segments (3 hours each).
+    busy_hours_str = "\n".join(
+        f"- {start}:00-{end}:00: {count}"
+        for (start, end), count in panda_stats.busy_hours(stats["hour_hist"]).items()
+    )
+    return (
+        f"**Total Transactions:** {total_transactions}",
+        f"**Transactions on {selected_day}:** {transactions_for_day}",
+        "**Transactions by Payment Method:**\n" + payment_stats_str,
+        "**Transactions by Busy Hours:**\n" + busy_hours_str,
+    )
+
 
 # -----------------------------
 # Create Middle Panel Charts
 # -----------------------------
-# Line chart: transactions over time (group by transaction_date)
-line_data = df.groupby("transaction_date").size().reset_index(name="count")
-line_fig = px.line(line_data, x="transaction_date", y="count", 
+@functools.lru_cache(maxsize=1)
+def _line_fig():
+    # Line chart: transactions over time (group by transaction_date)
+    # Downsampled so the number of plotted points stays bounded.
+    line_data = panda_stats.downsample(_data()[1]["daily"], "count")
+    return px.line(line_data, x="transaction_date", y="count",
                    title="Transactions Over Time",
-                   markers=True)
+                   markers=True, render_mode="webgl")
+
+
+@functools.lru_cache(maxsize=1)
+def _pie_fig():
+    # Pie chart: transactions by payment method
+    payment_counts = _data()[1]["payment_counts"]
+    return px.pie(names=list(payment_counts.keys()),
+                  values=list(payment_counts.values()),
+                  title="Transactions by Payment Method")
 
-# Pie chart: transactions by payment method
-pie_data = df["payment_method"].value_counts().reset_index()
-pie_data.columns = ["payment_method", "count"]
-pie_fig = px.pie(pie_data, names="payment_method", values="count",
-                 title="Transactions by Payment Method")
 
 # -----------------------------
 # Bottom Panel: Data Filtering
 # -----------------------------
-def filter_data(payment_method):
+@functools.lru_cache(maxsize=1)
+def _display_positions():
+    # Column positions of the table fields, so a page is one iloc gather of the
+    # matching rows and displayed columns (entry_dt stays out of the table).
+    df = _data()[0]
+    return [df.columns.get_loc(c) for c in panda_stats.DISPLAY_COLUMNS]
+
+
+def filter_data(payment_method, page=1):
+    # Only one page of the filtered rows is handed to the table. The page is
+    # clamped to the filtered row count and returned with a row-range caption.
+    df, _, pm_index = _data()
     if payment_method != "All":
-        filtered_df = df[df["payment_method"] == payment_method].reset_index(drop=True)
+        rows = pm_index.get(payment_method, [])
+        total = len(rows)
+    else:
+        rows = None
+        total = len(df)
+    page_count = max(1, -(-total // PAGE_SIZE))
+    page = min(max(int(page or 1), 1), page_count)
+    start = (page - 1) * PAGE_SIZE
+    if rows is None:
+        rows = slice(start, start + PAGE_SIZE)
     else:
-        filtered_df = df.copy()
-    return filtered_df
+        rows = rows[start : start + PAGE_SIZE]
+    page_df = df.iloc[rows, _display_positions()].reset_index(drop=True)
+    caption = f"Showing rows {min(start + 1, total)}-{start + len(page_df)} of {total}"
+    return page_df, page, caption
+
 
 payment_options = ["All", "EMONEY", "FLASH", "QRIS", "GOPAY", "DANA", "OVO"]
 
@@ -79,29 +122,35 @@ with gr.Blocks() as demo:
     gr.Markdown("### Overview Statistics")
     with gr.Row():
         with gr.Column():
-            stat_total = gr.Markdown(f"**Total Transactions:** {total_transactions}")
+            stat_total = gr.Markdown(lambda: _stats()[0])
         with gr.Column():
-            stat_day = gr.Markdown(f"**Transactions on {selected_day}:** {transactions_for_day}")
+            stat_day = gr.Markdown(lambda: _stats()[1])
     with gr.Row():
         with gr.Column():
-            stat_payment = gr.Markdown("**Transactions by Payment Method:**\n" + payment_stats_str)
+            stat_payment = gr.Markdown(lambda: _stats()[2])
         with gr.Column():
-            stat_busy = gr.Markdown("**Transactions by Busy Hours:**\n" + busy_hours_str)
+            stat_busy = gr.Markdown(lambda: _stats()[3])
     
     # --- Middle Panel ---
     gr.Markdown("### Visualizations")
     with gr.Row():
-        chart_line = gr.Plot(line_fig)
-        chart_pie = gr.Plot(pie_fig)
+        chart_line = gr.Plot(_line_fig)
+        chart_pie = gr.Plot(_pie_fig)
     
     # --- Bottom Panel ---
     gr.Markdown("### Detailed Transaction Data")
     with gr.Row():
         payment_dropdown = gr.Dropdown(label="Filter by Payment Method", choices=payment_options, value="All")
-    data_table = gr.Dataframe(value=df, label="Parking Transactions", interactive=True)
+        page_number = gr.Number(label="Page", value=1, minimum=1, precision=0)
+    page_caption = gr.Markdown(lambda: filter_data("All")[2])
+    data_table = gr.Dataframe(value=lambda: filter_data("All")[0], label="Parking Transactions", interactive=True)
     
-    # Update the table based on payment method filter.
-    payment_dropdown.change(fn=filter_data, inputs=payment_dropdown, outputs=data_table)
+    # Update the table based on payment method filter and page. A new filter
+    # starts again at page 1; page edits are clamped to the filtered rows.
+    filter_outputs = [data_table, page_number, page_caption]
+    payment_dropdown.change(fn=lambda pm: filter_data(pm, 1), inputs=payment_dropdown, outputs=filter_outputs)
+    page_number.input(fn=filter_data, inputs=[payment_dropdown, page_number], outputs=filter_outputs)
 
 # Launch the dashboard.
-demo.launch()
+if __name__ == "__main__":
+    demo.launch()
@@ -0,0 +1,257 @@
+import json
+import os
+import warnings
+from datetime import datetime, timezone
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Shared data loading and statistics for the Streamlit (app.py) and
+# Gradio (main.py) dashboards. Kept free of UI imports; each dashboard
+# wraps these functions with its own caching.
+# -----------------------------
+
+# Generated from panda-park-data.json by convert.py; entry_dt is stored
+# already parsed, so loading does no JSON decoding or datetime parsing.
+DATA_PATH = "panda-park-data.parquet"
+# Append-only log of edit-form changes, replayed on top of the Parquet base
+# at load and folded into the JSON source by `python convert.py --compact`.
+EDITS_PATH = "edits.jsonl"
+COLUMNS = [
+    "transaction_id",
+    "license_plate",
+    "vehicle_type",
+    "entry_time",
+    "exit_time",
+    "duration_minutes",
+    "charge",
+    "payment_method",
+    "transaction_date",
+    "parking_location",
+    "capture_license_plate_url",
+    "entry_dt",
+]
+CATEGORY_COLUMNS = ["payment_method", "transaction_date"]
+# ISO 8601 with a UTC offset, e.g. "2025-02-20T10:15:00Z".
+ENTRY_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+# entry_dt only feeds the entry-hour histogram and is never shown in a table.
+DISPLAY_COLUMNS = [column for column in COLUMNS if column != "entry_dt"]
+
+# Upper bound on points per time-series line sent to the browser.
+MAX_POINTS = 2000
+
+# Operational hours 10:00-22:00 divided into 4 segments (3 hours each).
+BUSY_SEGMENTS = [(10, 13), (13, 16), (16, 19), (19, 22)]
+
+
+def load_data(path=DATA_PATH, edits_path=EDITS_PATH):
+    df = pd.read_parquet(path, columns=COLUMNS)
+    # Low-cardinality strings become categoricals: filters compare small
+    # integer codes and the per-day/payment counts run as bincounts.
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+    # A log set aside by a running or interrupted compaction is older than the
+    # live log, so it is replayed first.
+    replay_edits(df, pending_edits_path(edits_path))
+    replay_edits(df, edits_path)
+    return df
+
+
+def pending_edits_path(edits_path=EDITS_PATH):
+    return f"{edits_path}.compacting"
+
+
+def compute_stats(df):
+    # The category codes index the days (categories are sorted), so the counts
+    # and the per-day duration sums are both single bincounts.
+    day = df["transaction_date"].cat
+    counts = np.bincount(day.codes.to_numpy(), minlength=len(day.categories))
+    durations = np.bincount(
+        day.codes.to_numpy(),
+        weights=df["duration_minutes"].to_numpy(),
+        minlength=len(day.categories),
+    )
+    present = counts > 0
+    daily = pd.DataFrame(
+        {
+            "transaction_date": np.asarray(day.categories)[present],
+            "count": counts[present],
+            "avg_duration": durations[present] / counts[present],
+        }
+    )
+    payment = df["payment_method"].cat
+    pm_counts = np.bincount(payment.codes.to_numpy(), minlength=len(payment.categories))
+    # Most frequent first; ties keep category (alphabetical) order, unlike
+    # value_counts(), which keeps first-appearance order.
+    order = np.argsort(-pm_counts, kind="stable")
+    return {
+        "daily": daily,
+        "payment_counts": {
+            payment.categories[i]: int(pm_counts[i]) for i in order if pm_counts[i]
+        },
+        "hour_hist": np.bincount(df["entry_dt"].dt.hour.to_numpy(), minlength=24),
+    }
+
+
+def busy_hours(hour_hist):
+    # Every segment is a slice of the same 24-bin entry-hour histogram.
+    return {
+        (start, end): int(hour_hist[start:end].sum()) for start, end in BUSY_SEGMENTS
+    }
+
+
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, from
+# each of the (max_points - 2) buckets in between, the point forming the
+# largest triangle with the previously kept point and the next bucket's mean.
+# x is the row position, so it works for any ordered series.
+def lttb_positions(y, max_points=MAX_POINTS):
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    kept = np.empty(max_points, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    prev = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[prev] - next_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (next_y - y[prev])
+        )
+        prev = start + int(np.argmax(area))
+        kept[i + 1] = prev
+    return kept
+
+
+def downsample(frame, y, max_points=MAX_POINTS):
+    # Returns frame unchanged when it is already small enough to plot.
+    if len(frame) <= max_points:
+        return frame
+    return frame.iloc[lttb_positions(frame[y].to_numpy(), max_points)]
+
+
+# Row positions per payment method, so changing the filter gathers only the
+# matching rows instead of rescanning the whole frame.
+def build_pm_index(df):
+    payment = df["payment_method"].cat
+    codes = payment.codes.to_numpy()
+    return {
+        pm: np.flatnonzero(codes == code) for code, pm in enumerate(payment.categories)
+    }
+
+
+# One boolean mask per (column, value) filter. Masks are cached individually
+# by the dashboards, so re-selecting a value costs nothing and combining
+# several active filters is a single logical AND.
+def build_mask(df, column, value):
+    values = df[column].cat
+    if value not in values.categories:
+        return np.zeros(len(df), dtype=bool)
+    return values.codes.to_numpy() == values.categories.get_loc(value)
+
+
+def select_rows(masks):
+    return np.flatnonzero(reduce(np.logical_and, masks))
+
+
+def _assign(df, rows, column, values):
+    if column in CATEGORY_COLUMNS:
+        new = set(values).difference(df[column].cat.categories)
+        if new:
+            # Categorical columns only accept known values; register new ones,
+            # keeping the categories sorted as compute_stats relies on it.
+            categories = sorted([*df[column].cat.categories, *new])
+            df[column] = df[column].cat.set_categories(categories)
+    df.loc[rows, column] = values
+
+
+def changed_fields(df, idx, changes):
+    # Only fields whose value differs from the stored row are applied and
+    # logged; an unchanged form submission yields an empty dict.
+    row = df.loc[idx]
+    return {column: value for column, value in changes.items() if row[column] != value}
+
+
+def apply_edit(df, idx, changes):
+    # Writes in place into the shared frame; callers must drop any cached
+    # statistics derived from it afterwards. entry_time is parsed first so an
+    # invalid or empty value raises ValueError before anything is written.
+    if "entry_time" in changes:
+        entry_dt = pd.to_datetime(
+            changes["entry_time"], format=ENTRY_TIME_FORMAT, utc=True
+        )
+        # An empty string parses to NaT instead of raising.
+        if pd.isna(entry_dt):
+            raise ValueError("Entry Time must not be empty")
+    for column, value in changes.items():
+        _assign(df, [idx], column, [value])
+    if "entry_time" in changes:
+        df.loc[idx, "entry_dt"] = entry_dt
+
+
+def append_edit(transaction_id, changes, path=EDITS_PATH):
+    # One line per changed field, so saving a record costs a small append
+    # instead of rewriting the whole dataset. Lines are keyed by
+    # transaction_id rather than row position, so they still find their
+    # record after the Parquet base is regenerated or reordered.
+    ts = datetime.now(timezone.utc).isoformat()
+    lines = [
+        json.dumps(
+            {
+                "transaction_id": str(transaction_id),
+                "field": field,
+                "new_value": value,
+                "ts": ts,
+            }
+        )
+        for field, value in changes.items()
+    ]
+    with open(path, "a") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def replay_edits(df, path=EDITS_PATH):
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        edits = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    if edits.empty:
+        return
+    # Map each logged transaction to its current row; edits for transactions
+    # no longer in the base are reported and skipped instead of failing the load.
+    positions = pd.Index(df["transaction_id"]).get_indexer(edits["transaction_id"])
+    missing = positions < 0
+    if missing.any():
+        unknown = sorted(set(edits.loc[missing, "transaction_id"]))
+        warnings.warn(f"{path}: skipping edits for unknown transactions {unknown}")
+        edits, positions = edits[~missing], positions[~missing]
+    edits = edits.assign(row=df.index[positions])
+    # Later edits of the same field win; each field is then written with a
+    # single vectorized assignment.
+    edits = edits.drop_duplicates(subset=["row", "field"], keep="last")
+    for field, group in edits.groupby("field", sort=False):
+        rows = group["row"].to_numpy()
+        values = group["new_value"].tolist()
+        if field == "entry_time":
+            # Parsed before any write, like apply_edit. Empty values parse to
+            # NaT; like unknown transactions they are reported and skipped, so
+            # one bad line cannot stop the dashboards or compaction loading.
+            entry_dt = pd.to_datetime(values, format=ENTRY_TIME_FORMAT, utc=True)
+            bad = entry_dt.isna()
+            if bad.any():
+                skipped = group["transaction_id"][bad].tolist()
+                warnings.warn(
+                    f"{path}: skipping empty entry_time for transactions {skipped}"
+                )
+                rows, entry_dt = rows[~bad], entry_dt[~bad]
+                values = [value for value, skip in zip(values, bad) if not skip]
+        _assign(df, rows, field, values)
+        if field == "entry_time":
+            df.loc[rows, "entry_dt"] = entry_dt
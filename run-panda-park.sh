@@ -1,2 +1,5 @@
 #!/bin/bash
-uv run -- streamlit run app.py
\ No newline at end of file
+if [ ! -f panda-park-data.parquet ] || [ panda-park-data.json -nt panda-park-data.parquet ]; then
+    uv run -- python convert.py
+fi
+uv run -- streamlit run app.py